@@ -26,9 +26,42 @@ import os
 import sys
 import yaml
 try:
-    from yaml import CLoader as Loader, CDumper as Dumper
+    from yaml import CSafeLoader as Loader, CSafeDumper as Dumper
 except ImportError:
-    from yaml import Loader, Dumper
+    from yaml import SafeLoader as Loader, SafeDumper as Dumper
+
+# The build version can't change while KiCad is running, so check it once.
+# NOTE: Some builds enclose the version string in parentheses,
+# so leading parens are removed
+_VER = pcbnew.GetBuildVersion().lstrip('(')
+# Interface changed between 5.x and 6.x, but we will support either
+V5_COMPAT = _VER.startswith('5')
+# Handle change in 6.x development branch
+# TODO: One day this might be released, and that will break this. But
+# I don't know when, so we'll just have to wait and see...
+USE_VECTOR2 = _VER.startswith('6.99')
+
+# Parsed layout files, keyed by path. The KiCad python interpreter persists
+# between plugin runs, so this lets us skip re-parsing an unchanged layout.yaml
+_YAML_CACHE = {}
+
+def load_layout(path):
+    """
+    Load a layout yaml file, reusing the previous result if the file is unchanged
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    # NOTE: On filesystems with coarse timestamps (e.g. FAT, some network shares)
+    # an edit that keeps the file size the same within the timestamp window will
+    # not be noticed, and the previous layout will be used
+    stamp = (st.st_mtime, st.st_size)
+    cached = _YAML_CACHE.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    with open(path) as f:
+        layout = yaml.load(f, Loader=Loader)
+    _YAML_CACHE[path] = (stamp, layout)
+    return layout
 
 class StreamToLogger(object):
    """
@@ -54,21 +87,13 @@ class ComponentLayout(pcbnew.ActionPlugin):
         self.show_toolbar_button = True
 
     def Run( self ):
-        # Interface changed between 5.x and 6.x, but we will support either
-        v5_compat = pcbnew.GetBuildVersion().startswith('5')
-        # Handle change in 6.x development branch
-        # NOTE: Some builds enclose the version string in parentheses,
-        # so leading parens are removed
-        # TODO: One day this might be released, and that will break this. But
-        # I don't know when, so we'll just have to wait and see...
-        use_vector2 = pcbnew.GetBuildVersion().lstrip('(').startswith('6.99')
-
         pcb = pcbnew.GetBoard()
         # In some cases, I have seen KIPRJMOD not set correctly here.
         #projdir = os.environ['KIPRJMOD']
         projdir = os.path.dirname(os.path.abspath(pcb.GetFileName()))
 
-        filehandler = logging.FileHandler(os.path.join(projdir, "component_layout_plugin.log"))
+        log_path = os.path.join(projdir, "component_layout_plugin.log")
+        filehandler = logging.FileHandler(log_path)
         filehandler.setLevel(logging.DEBUG)
         formatter = logging.Formatter('%(asctime)s %(name)s %(lineno)d:%(message)s')
         filehandler.setFormatter(formatter)
@@ -81,10 +106,9 @@ class ComponentLayout(pcbnew.ActionPlugin):
         logger.addHandler(filehandler)
         logger.setLevel(logging.DEBUG)
 
-        logger.info('Logging to {}...'.format(os.path.join(projdir, "component_layout_plugin.log")))
+        logger.info('Logging to {}...'.format(log_path))
         
-        with open(os.path.join(projdir, 'layout.yaml')) as f:
-            layout = yaml.load(f.read(), Loader)
+        layout = load_layout(os.path.join(projdir, 'layout.yaml'))
         
         logger.info("Executing component_layout_plugin")
         
@@ -107,16 +131,46 @@ class ComponentLayout(pcbnew.ActionPlugin):
         if not 'components' in layout:
             logger.warning("No components field found in layout.yaml")
 
-        for refdes, props in layout.get('components', {}).items():
-            if v5_compat:
-                mod = pcb.FindModuleByReference(refdes)
-            else:
-                mod = pcb.FindFootprintByReference(refdes)
+        # Index footprints by reference once, rather than doing a linear search
+        # of the board for every component in the layout
+        if V5_COMPAT:
+            footprints = pcb.GetModules()
+        else:
+            footprints = pcb.GetFootprints()
+        # Several footprints can share a reference (e.g. REF** or unannotated
+        # parts), so keep the first match like Find{Module,Footprint}ByReference
+        mods_by_ref = {}
+        for m in footprints:
+            mods_by_ref.setdefault(m.GetReference(), m)
+        mods_by_ref_get = mods_by_ref.get
+
+        # Resolve the API differences once, instead of for every component
+        ## Latest needs a pcbnew.VECTOR2I, 6.0.1 needs wxPoint
+        if USE_VECTOR2:
+            make_pos = pcbnew.VECTOR2I_MM
+        else:
+            make_pos = pcbnew.wxPointMM
+        if V5_COMPAT:
+            flip_call = lambda m, p: m.Flip(p)
+        else:
+            flip_call = lambda m, p: m.Flip(p, False)
+        # Pad "name" was renamed to "number" in 6.x
+        if V5_COMPAT:
+            pad_num = lambda p: p.GetName()
+        else:
+            pad_num = lambda p: p.GetNumber()
+
+        # Many components typically share a footprint library, so only join each path once
+        fp_path_cache = {}
+
+        components = layout.get('components', {}).items()
+        for refdes, props in components:
+            mod = mods_by_ref_get(refdes)
             if mod is None:
                 logger.warning("Did not find component {} in PCB design".format(refdes))
                 continue
             
-            flip = props.get('flip', False) # Generally, flip means put on the bottom
+            flip = bool(props.get('flip', False)) # Generally, flip means put on the bottom
             
             if 'footprint' in props:
                 # I think there's no API to map the library nickname to a library
@@ -124,15 +178,17 @@ class ComponentLayout(pcbnew.ActionPlugin):
                 # I also see no way to find the path from which the footprint was 
                 # previously found, so we're only comparing the name. This should
                 # be good enough in pretty much all cases, but it is a bit ugly.
-                footprint_path = os.path.join(projdir, props['footprint']['path'])
+                footprint_path = fp_path_cache.get(props['footprint']['path'])
+                if footprint_path is None:
+                    footprint_path = os.path.join(projdir, props['footprint']['path'])
+                    fp_path_cache[props['footprint']['path']] = footprint_path
                 footprint_name = props['footprint']['name']
                 
                 if mod.GetFPID().GetUniStringLibId() != footprint_name:
                     # As far as I can tell, you can't change the footprint of a module, you have to delete and re-add
                     # Save important properties of the existing module
                     ref = mod.GetReference()
-                    pads = list(mod.Pads())
-                    nets = [p.GetNet() for p in pads]
+                    old_nets = {pad_num(p): p.GetNet() for p in mod.Pads()}
                     value = mod.GetValue()
 
                     newmod = pcbnew.FootprintLoad(footprint_path, footprint_name)
@@ -143,31 +199,40 @@ class ComponentLayout(pcbnew.ActionPlugin):
 
                     # Restore original props to the new module
                     newmod.SetReference(ref)
-                    for p, net in zip(pads, nets):
-                        p.SetNet(net)
+                    # Match pads by number, since pad order can differ between footprints.
+                    # Unnumbered pads (e.g. mounting holes) carry no net, so skip them.
+                    for new_pad in newmod.Pads():
+                        num = pad_num(new_pad)
+                        if num == '':
+                            continue
+                        net = old_nets.get(num)
+                        if net is None:
+                            logger.warning("No pad {} on previous footprint for {}; leaving it unconnected".format(num, ref))
+                            continue
+                        new_pad.SetNet(net)
                     newmod.SetValue(value)
                     pcb.Add(newmod)
+                    mods_by_ref[ref] = newmod
                     mod = newmod
                 
             if 'location' in props:
                 x = props['location'][0]
                 y = props['location'][1]
-
-                ## Latest needs a pcbnew.VECTOR2I, 6.0.1 needs wxPoint
-                if use_vector2:
-                    mod.SetPosition(pcbnew.VECTOR2I_MM(x0 + x, y0 + y))
-                else:
-                    mod.SetPosition(pcbnew.wxPointMM(x0 + x, y0 + y))
+                mod.SetPosition(make_pos(x0 + x, y0 + y))
             
-            if flip ^ (mod.IsFlipped()):
-                if v5_compat:
-                    mod.Flip(mod.GetPosition())
-                else:
-                    mod.Flip(mod.GetPosition(), False)
+            # Only flip when the requested side differs from the current one
+            is_flipped = mod.IsFlipped()
+            if flip ^ is_flipped:
+                flip_call(mod, mod.GetPosition())
             
             if 'rotation' in props:
                 rotation = props['rotation']
                 mod.SetOrientationDegrees(rotation)
+
+        # Rebuild connectivity (ratsnest) and redraw once after all edits,
+        # rather than leaving it to happen piecemeal as footprints move
+        pcb.BuildConnectivity()
+        pcbnew.Refresh()
             
 
 ComponentLayout().register()
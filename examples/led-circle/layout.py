@@ -1,5 +1,9 @@
-import math
+import numpy as np
 import yaml
+try:
+    from yaml import CSafeDumper as Dumper
+except ImportError:
+    from yaml import SafeDumper as Dumper
 
 # The number of LEDs
 N_LEDS = 10
@@ -12,30 +16,30 @@ BOTTOM = True
 # Specifies the x, y coordinate of the center of the circle
 ORIGIN = [200, 80]
 
-components = {}
-
-for n in range(N_LEDS):
-    refdes = f"D{n+1}"
-    # Split the circle up into N equal segments (think pizza slices here)
-    dTheta = 2 * math.pi / N_LEDS
-    # Place LEDs around the circle, every dTheta radians
-    theta = n * dTheta
-    # The rounding isn't strictly necessary, but I like that it makes the files more readable
-    # and we don't need better than um position resolution for our LEDs! 
-    x = round(RADIUS * math.sin(theta), 3)
-    y = round(RADIUS * math.cos(theta), 3)
-
-    # theta is in radians, but yaml file rotation value must be written in degrees
-    if ROTATE:
-        rotation = 180 + theta * 180 / math.pi
-    else:
-        rotation = 0
-
-    components[refdes] = { 
-        'location': [x, y],
+# Split the circle up into N equal segments (think pizza slices here)
+dTheta = 2 * np.pi / N_LEDS
+# Place LEDs around the circle, every dTheta radians
+theta = np.arange(N_LEDS) * dTheta
+# The rounding isn't strictly necessary, but I like that it makes the files more readable
+# and we don't need better than um position resolution for our LEDs! 
+xs = np.round(RADIUS * np.sin(theta), 3)
+ys = np.round(RADIUS * np.cos(theta), 3)
+
+# theta is in radians, but yaml file rotation value must be written in degrees
+# Values are converted back to plain python floats so the yaml dumper can represent them
+if ROTATE:
+    rotations = [float(r) for r in 180 + theta * 180 / np.pi]
+else:
+    rotations = [0] * N_LEDS
+
+components = {
+    f"D{n+1}": {
+        'location': [float(xs[n]), float(ys[n])],
         'flip': BOTTOM,
-        'rotation': rotation,
+        'rotation': rotations[n],
     }
+    for n in range(N_LEDS)
+}
 
 
 layout = {
@@ -44,4 +48,4 @@ layout = {
 }
 
 with open('layout.yaml', 'w') as f:
-    f.write(yaml.safe_dump(layout, default_flow_style=None))
\ No newline at end of file
+    yaml.dump(layout, f, Dumper=Dumper, default_flow_style=None)
\ No newline at end of file